@@ -0,0 +1,41 @@
+
+# Writes wb_snapshot.parquet with the full indicator history for every
+# country, so the dashboards serve cold loads from disk instead of the
+# live API. Run periodically (e.g. a weekly cron) to refresh.
+
+import numpy as np
+import orjson
+import pandas as pd
+import requests
+
+from wb_client import INDICATORS, SNAPSHOT_PATH
+
+def fetch_all_rows():
+    inds = ";".join(INDICATORS.values())
+    url = (f"https://api.worldbank.org/v2/country/all/indicator/{inds}"
+           "?format=json&source=2&per_page=20000&page={page}")
+    session = requests.Session()
+    rows = []
+    page = 1
+    while True:
+        res = orjson.loads(session.get(url.format(page=page), timeout=60).content)
+        meta, data = res[0], (res[1] if len(res) > 1 else None)
+        rows.extend(data or [])
+        if page >= int(meta["pages"]):
+            break
+        page += 1
+    return rows
+
+def main():
+    rows = [r for r in fetch_all_rows() if r["value"] is not None]
+    df = pd.DataFrame({
+        "code": pd.Categorical([r["country"]["id"] for r in rows]),
+        "indicator": pd.Categorical([r["indicator"]["id"] for r in rows]),
+        "year": np.array([int(r["date"]) for r in rows], dtype=np.int32),
+        "value": np.array([r["value"] for r in rows], dtype=np.float64),
+    })
+    df.to_parquet(SNAPSHOT_PATH, index=False)
+    print(f"Wrote {len(df)} rows to {SNAPSHOT_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,20 @@
 
 import streamlit as st
 import pandas as pd
-import requests
+import numpy as np
 import datetime
-import altair as alt
 from io import BytesIO
 
+from wb_client import get_country_list, build_all_metrics
+
+CURRENT_YEAR = datetime.datetime.now().year - 1
+
 st.set_page_config(layout="wide")
 st.title("🔫 Guns and Butter Index – Advanced Comparison Dashboard")
 
 # -------------------------------
 # 1. Constants
 # -------------------------------
-INDICATORS = {
-    "military": "MS.MIL.XPND.GD.ZS",
-    "education": "SE.XPD.TOTL.GD.ZS",
-    "health": "SH.XPD.CHEX.GD.ZS",
-}
 REGIONAL_GROUPS = {
     "Sub-Saharan Africa": ["NG", "ZA", "KE", "ET", "GH"],
     "Europe & Central Asia": ["DE", "FR", "IT", "GB", "PL"],
@@ -27,50 +25,9 @@ REGIONAL_GROUPS = {
 }
 
 # -------------------------------
-# 2. Data Functions
+# 2. UI Controls
 # -------------------------------
-@st.cache_data(show_spinner=False)
-def get_country_list():
-    url = "https://api.worldbank.org/v2/country?format=json&per_page=500"
-    res = requests.get(url).json()[1]
-    return sorted([(c["id"], f"{c['name']} ({c['id']})", c["region"]["value"]) for c in res if c["region"]["value"] != "Aggregates"], key=lambda x: x[1])
-
-def get_indicator_data(country_code, indicator):
-    url = f"https://api.worldbank.org/v2/country/{country_code}/indicator/{indicator}?format=json&per_page=1000"
-    res = requests.get(url).json()
-    if len(res) < 2:
-        return pd.DataFrame()
-    data = res[1]
-    df = pd.DataFrame(data)[["date", "value"]].dropna()
-    df["date"] = pd.to_numeric(df["date"])
-    df["value"] = pd.to_numeric(df["value"], errors="coerce")
-    df.set_index("date", inplace=True)
-    return df.sort_index()
-
-def build_country_metrics(code):
-    mil = get_indicator_data(code, INDICATORS["military"])
-    edu = get_indicator_data(code, INDICATORS["education"])
-    hlth = get_indicator_data(code, INDICATORS["health"])
-    if mil.empty or edu.empty or hlth.empty:
-        return None
-    all_years = mil.index.union(edu.index).union(hlth.index)
-    df = pd.DataFrame(index=all_years)
-    df["Military"] = mil["value"]
-    df["Education"] = edu["value"]
-    df["Health"] = hlth["value"]
-    df["Butter"] = df["Education"] + df["Health"]
-    df["G/B Ratio"] = df["Military"] / df["Butter"]
-    df = df.sort_index().astype(float)
-    df = df.interpolate(limit_direction="both")
-    return df
-
-# -------------------------------
-# 3. UI Controls
-# -------------------------------
-countries = get_country_list()
-country_codes = [c[0] for c in countries]
-code_to_name = {c[0]: c[1] for c in countries}
-code_to_region = {c[0]: c[2] for c in countries}
+_, country_codes, code_to_name, code_to_region = get_country_list()
 
 default = [c for c in ["US", "CN", "RU"] if c in country_codes]
 selected = st.multiselect(
@@ -80,63 +37,86 @@ selected = st.multiselect(
     format_func=lambda x: code_to_name.get(x, x)
 )
 
-year_range = st.slider("Year Range", 1990, datetime.datetime.now().year - 1, (2000, 2022))
+year_range = st.slider("Year Range", 1990, CURRENT_YEAR, (2000, 2022))
 
 metrics = st.multiselect("📊 Metrics to Display", ["Military", "Butter", "G/B Ratio"], default=["G/B Ratio"])
 
 # -------------------------------
-# 4. Data Compilation
+# 3. Data Compilation
 # -------------------------------
-combined = pd.DataFrame()
-long_data = []
+years, values, countries_col, metrics_col = [], [], [], []
+
+metrics_by_code = build_all_metrics(tuple(selected), years=year_range) if selected else {}
 
 for code in selected:
     name = code_to_name.get(code, code)
-    df = build_country_metrics(code)
+    df = metrics_by_code.get(code)
     if df is None: continue
-    df = df.loc[(df.index >= year_range[0]) & (df.index <= year_range[1])]
+    df = df.loc[year_range[0]:year_range[1]]
     for metric in metrics:
-        temp = df[[metric]].copy()
-        temp["Country"] = name
-        temp["Metric"] = metric
-        temp = temp.rename(columns={metric: "Value"})
-        long_data.append(temp)
-
-if long_data:
-    chart_df = pd.concat(long_data).reset_index().rename(columns={"date": "Year"})
+        arr = df[metric].to_numpy()
+        years.append(df.index.to_numpy())
+        values.append(arr)
+        countries_col.append(np.full(len(arr), name, dtype=object))
+        metrics_col.append(np.full(len(arr), metric, dtype=object))
+
+if years:
+    chart_df = pd.DataFrame({
+        "Year": np.concatenate(years),
+        "Value": np.concatenate(values),
+        "Country": np.concatenate(countries_col),
+        "Metric": np.concatenate(metrics_col),
+    })
+    chart_df["Year"] = chart_df["Year"].astype(np.int16)
+    chart_df["Country"] = chart_df["Country"].astype("category")
+    chart_df["Metric"] = chart_df["Metric"].astype("category")
 else:
     chart_df = pd.DataFrame()
 
 # -------------------------------
-# 5. Altair Chart
+# 4. Altair Chart
 # -------------------------------
-if not chart_df.empty:
-    st.subheader("📈 Interactive Chart")
-    chart = alt.Chart(chart_df).mark_line().encode(
+@st.cache_data(show_spinner=False)
+def _make_chart(df):
+    import altair as alt  # deferred so chart-less reruns skip the import cost
+
+    chart = alt.Chart(df).mark_line().encode(
         x=alt.X("Year:O", axis=alt.Axis(labelAngle=0)),
         y="Value:Q",
         color="Country:N",
         strokeDash="Metric:N",
         tooltip=["Year", "Country", "Metric", "Value"]
     ).properties(width=1000, height=450)
-    st.altair_chart(chart, use_container_width=True)
+    # Lift the default transformer's 5000-row cap for large selections
+    with alt.data_transformers.enable("default", max_rows=None):
+        return chart.to_dict()
+
+if not chart_df.empty:
+    st.subheader("📈 Interactive Chart")
+    st.vega_lite_chart(_make_chart(chart_df), use_container_width=True)
 
 # -------------------------------
-# 6. Tabs & Data Export
+# 5. Tabs & Data Export
 # -------------------------------
 st.subheader("📋 Raw Data & Export")
 with st.expander("Show data table"):
     st.dataframe(chart_df)
 
+@st.cache_data(show_spinner=False)
 def convert_df_to_csv(df):
-    return df.to_csv(index=False).encode("utf-8")
+    import pyarrow as pa
+    import pyarrow.csv
+
+    buf = BytesIO()
+    pa.csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue()
 
 if not chart_df.empty:
     csv = convert_df_to_csv(chart_df)
     st.download_button("📥 Download CSV", csv, "guns_butter_data.csv", "text/csv")
 
 # -------------------------------
-# 7. Ask for Context
+# 6. Ask for Context
 # -------------------------------
 st.subheader("🧠 Ask Why Something Happened")
 
@@ -1,90 +1,74 @@
 
 import streamlit as st
 import pandas as pd
-import requests
+import numpy as np
 import datetime
-import altair as alt
+from concurrent.futures import ThreadPoolExecutor
 
-st.set_page_config(layout="wide")
-st.title("🔫 Guns and Butter Index – Data + Context")
-
-INDICATORS = {
-    "military": "MS.MIL.XPND.GD.ZS",
-    "education": "SE.XPD.TOTL.GD.ZS",
-    "health": "SH.XPD.CHEX.GD.ZS",
-}
-
-@st.cache_data(show_spinner=False)
-def get_country_list():
-    url = "https://api.worldbank.org/v2/country?format=json&per_page=500"
-    res = requests.get(url).json()[1]
-    return sorted([(c["id"], f"{c['name']} ({c['id']})") for c in res if c["region"]["value"] != "Aggregates"], key=lambda x: x[1])
+from wb_client import get_country_list, build_metrics
 
-def get_indicator_data(code, indicator):
-    url = f"https://api.worldbank.org/v2/country/{code}/indicator/{indicator}?format=json&per_page=1000"
-    res = requests.get(url).json()
-    if len(res) < 2: return pd.DataFrame()
-    df = pd.DataFrame(res[1])[["date", "value"]].dropna()
-    df["date"] = pd.to_numeric(df["date"])
-    df["value"] = pd.to_numeric(df["value"], errors="coerce")
-    df.set_index("date", inplace=True)
-    return df.sort_index()
+CURRENT_YEAR = datetime.datetime.now().year - 1
 
-def build_metrics(code, interpolate):
-    mil = get_indicator_data(code, INDICATORS["military"])
-    edu = get_indicator_data(code, INDICATORS["education"])
-    hlth = get_indicator_data(code, INDICATORS["health"])
-    if mil.empty or edu.empty or hlth.empty: return None
-    all_years = mil.index.union(edu.index).union(hlth.index)
-    df = pd.DataFrame(index=all_years)
-    df["Military"] = mil["value"]
-    df["Education"] = edu["value"]
-    df["Health"] = hlth["value"]
-    df["Butter"] = df["Education"] + df["Health"]
-    df["G/B Ratio"] = df["Military"] / df["Butter"]
-    df = df.sort_index().astype(float)
-    if interpolate:
-        df = df.interpolate(limit_area="inside", limit_direction="both")
-    return df
+st.set_page_config(layout="wide")
+st.title("🔫 Guns and Butter Index – Data + Context")
 
-countries = get_country_list()
-country_codes = [c[0] for c in countries]
-code_to_name = {c[0]: c[1] for c in countries}
+_, country_codes, code_to_name, _ = get_country_list()
 
 default = ["US", "CN", "RU"]
 selected = st.multiselect("🌍 Select Countries", country_codes, default=[c for c in default if c in country_codes], format_func=lambda x: code_to_name.get(x, x))
-year_range = st.slider("📅 Year Range", 1990, datetime.datetime.now().year - 1, (2000, 2022))
+year_range = st.slider("📅 Year Range", 1990, CURRENT_YEAR, (2000, 2022))
 metrics = st.multiselect("📊 Metrics", ["Military", "Butter", "G/B Ratio"], default=["G/B Ratio"])
 interpolate = st.checkbox("Allow Interpolation", value=True)
 
-combined = []
-for code in selected:
+years, values, countries_col, metrics_col = [], [], [], []
+
+if selected:
+    with ThreadPoolExecutor(max_workers=min(16, len(selected))) as ex:
+        results = list(ex.map(lambda c: build_metrics(c, interpolate, years=year_range), selected))
+else:
+    results = []
+
+for code, df in zip(selected, results):
     name = code_to_name.get(code, code)
-    df = build_metrics(code, interpolate)
     if df is None: continue
-    df = df[(df.index >= year_range[0]) & (df.index <= year_range[1])]
+    df = df.loc[year_range[0]:year_range[1]]
     for metric in metrics:
-        temp = df[[metric]].copy()
-        temp["Country"] = name
-        temp["Metric"] = metric
-        temp = temp.rename(columns={metric: "Value"})
-        combined.append(temp)
+        arr = df[metric].to_numpy()
+        years.append(df.index.to_numpy())
+        values.append(arr)
+        countries_col.append(np.full(len(arr), name, dtype=object))
+        metrics_col.append(np.full(len(arr), metric, dtype=object))
 
-if combined:
-    chart_df = pd.concat(combined).reset_index().rename(columns={"date": "Year"})
+if years:
+    chart_df = pd.DataFrame({
+        "Year": np.concatenate(years),
+        "Value": np.concatenate(values),
+        "Country": np.concatenate(countries_col),
+        "Metric": np.concatenate(metrics_col),
+    })
+    chart_df["Year"] = chart_df["Year"].astype(np.int16)
+    chart_df["Country"] = chart_df["Country"].astype("category")
+    chart_df["Metric"] = chart_df["Metric"].astype("category")
 else:
     chart_df = pd.DataFrame()
 
-if not chart_df.empty:
-    st.subheader("📈 Interactive Chart")
-    chart = alt.Chart(chart_df).mark_line().encode(
+@st.cache_data(show_spinner=False)
+def _make_chart(df):
+    import altair as alt
+
+    chart = alt.Chart(df).mark_line().encode(
         x=alt.X("Year:O", axis=alt.Axis(labelAngle=0)),
         y="Value:Q",
         color="Country:N",
         strokeDash="Metric:N",
         tooltip=["Year", "Country", "Metric", "Value"]
     ).properties(width=1000, height=450)
-    st.altair_chart(chart, use_container_width=True)
+    with alt.data_transformers.enable("default", max_rows=None):
+        return chart.to_dict()
+
+if not chart_df.empty:
+    st.subheader("📈 Interactive Chart")
+    st.vega_lite_chart(_make_chart(chart_df), use_container_width=True)
 
 st.subheader("📋 Raw Data")
 st.dataframe(chart_df.round(2), use_container_width=True)
@@ -1,74 +1,23 @@
 import streamlit as st
 import pandas as pd
-import requests
+import numpy as np
 import datetime
-import altair as alt
-import re
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 
-st.set_page_config(layout="wide")
-st.title("Guns and Butter Index")
+from wb_client import get_country_list, build_metrics
 
-# ===============================
-# 1. Constants
-# ===============================
-INDICATORS = {
-    "military": "MS.MIL.XPND.GD.ZS",
-    "education": "SE.XPD.TOTL.GD.ZS",
-    "health": "SH.XPD.CHEX.GD.ZS",
-}
+CURRENT_YEAR = datetime.datetime.now().year - 1
 
-# ===============================
-# 2. Data Functions
-# ===============================
-@st.cache_data(show_spinner=False)
-def get_country_list():
-    url = "https://api.worldbank.org/v2/country?format=json&per_page=500"
-    res = requests.get(url).json()[1]
-    return {c["id"]: {"name": c["name"], "region": c["region"]["value"]}
-            for c in res if c["region"]["value"] != "Aggregates"}
-
-def get_indicator_data(code, indicator):
-    url = f"https://api.worldbank.org/v2/country/{code}/indicator/{indicator}?format=json&per_page=1000"
-    res = requests.get(url).json()
-    if len(res) < 2:
-        return pd.DataFrame()
-    df = pd.DataFrame(res[1])[["date", "value"]].dropna()
-    df["date"] = pd.to_numeric(df["date"])
-    df["value"] = pd.to_numeric(df["value"], errors="coerce")
-    df.set_index("date", inplace=True)
-    return df.sort_index()
-
-def build_metrics(code, allow_interpolation):
-    mil = get_indicator_data(code, INDICATORS["military"])
-    edu = get_indicator_data(code, INDICATORS["education"])
-    hlth = get_indicator_data(code, INDICATORS["health"])
-    if mil.empty or edu.empty or hlth.empty:
-        return None
-    all_years = mil.index.union(edu.index).union(hlth.index)
-    df = pd.DataFrame(index=all_years)
-    df["Military"] = mil["value"]
-    df["Education"] = edu["value"]
-    df["Health"] = hlth["value"]
-    df["Butter"] = df["Education"] + df["Health"]
-    df["G/B Ratio"] = df["Military"] / df["Butter"]
-    df = df.sort_index().astype(float)
-    df.index.name = "Year"
-    df["Source"] = "Real"
-    if allow_interpolation:
-        df_interpolated = df.interpolate(limit_area="inside", limit_direction="both")
-        for col in ["Military", "Education", "Health", "Butter", "G/B Ratio"]:
-            mask = df[col].isna() & df_interpolated[col].notna()
-            df_interpolated.loc[mask, "Source"] = "Interpolated"
-        df = df_interpolated
-    return df
+st.set_page_config(layout="wide")
+st.title("Guns and Butter Index")
 
 # ===============================
-# 3. UI Controls
+# 1. UI Controls
 # ===============================
 st.subheader("Input Controls")
 
-country_data = get_country_list()
-all_country_codes = list(country_data.keys())
+country_data, all_country_codes, _, _ = get_country_list()
 
 def display_country(code):
     info = country_data.get(code, {})
@@ -86,9 +35,9 @@ with col1:
 
 with col2:
     year_range = st.slider(
-        "Select Year Range:", 
-        1990, 
-        datetime.datetime.now().year - 1, 
+        "Select Year Range:",
+        1990,
+        CURRENT_YEAR,
         (2000, 2022)
     )
 
@@ -116,57 +65,88 @@ with col4:
         )
 
 # ===============================
-# 4. Data Processing
+# 2. Data Processing
 # ===============================
-data_list = []
+# Nothing below can render until both countries and metrics are chosen,
+# so skip all per-country work while the user is still configuring
+if not (selected_codes and metrics_selected):
+    st.info("Please select one or more countries and at least one metric to display data.")
+    st.stop()
+
+years_col, values_col, countries_col, metrics_col, sources_col = [], [], [], [], []
 chart_df = pd.DataFrame()  # Initialize empty DataFrame
 
-if selected_codes:  # Only process if countries are selected
-    for code in selected_codes:
-        name = country_data.get(code, {}).get("name", code)
-        df = build_metrics(code, allow_interpolation)
-        if df is None:
-            continue
-        df = df[(df.index >= year_range[0]) & (df.index <= year_range[1])]
-        if show_only_real:
-            df = df[df["Source"] == "Real"]
-        for metric in metrics_selected:
-            temp = df[[metric, "Source"]].copy()
-            temp["Country"] = name
-            temp["Metric"] = metric
-            temp = temp.reset_index()  # creates "Year" column
-            temp["Year"] = pd.to_numeric(temp["Year"], errors="coerce").astype(int)
-            temp = temp.rename(columns={metric: "Value"})
-            data_list.append(temp)
-    
-    if data_list:  # Only concatenate if we have data
-        chart_df = pd.concat(data_list)
+_names = {c: country_data.get(c, {}).get("name", c) for c in selected_codes}
+_metrics = tuple(metrics_selected)
+_y0, _y1 = year_range
+with ThreadPoolExecutor(max_workers=min(8, len(selected_codes))) as ex:
+    frames = list(ex.map(lambda c: build_metrics(c, allow_interpolation, years=year_range), selected_codes))
+for code, df in zip(selected_codes, frames):
+    name = _names[code]
+    if df is None:
+        continue
+    df = df.loc[_y0:_y1]
+    if show_only_real:
+        df = df[df["Source"] == "Real"]
+    yr = df.index.to_numpy()
+    src = df["Source"].to_numpy()
+    for metric in _metrics:
+        arr = df[metric].to_numpy()
+        years_col.append(yr)
+        values_col.append(arr)
+        countries_col.append(np.full(len(arr), name, dtype=object))
+        metrics_col.append(np.full(len(arr), metric, dtype=object))
+        sources_col.append(src)
+
+if years_col:  # Only build if we have data
+    chart_df = pd.DataFrame({
+        "Year": np.concatenate(years_col).astype(np.int16),
+        "Value": np.concatenate(values_col),
+        "Country": pd.Categorical(np.concatenate(countries_col)),
+        "Metric": pd.Categorical(np.concatenate(metrics_col)),
+        "Source": pd.Categorical(np.concatenate(sources_col)),
+    })
 
 # ===============================
-# 5. Visualization
+# 3. Visualization
 # ===============================
-if not chart_df.empty:
-    st.subheader("Interactive Chart")
-    chart = alt.Chart(chart_df).mark_line().encode(
+@st.cache_data(show_spinner=False)
+def _make_chart(df):
+    import altair as alt
+
+    chart = alt.Chart(df).mark_line().encode(
         x=alt.X("Year:Q", axis=alt.Axis(labelAngle=0)),
         y="Value:Q",
         color="Country:N",
         strokeDash="Metric:N",
         tooltip=["Year", "Country", "Metric", "Value", "Source"]
     ).properties(width=1000, height=450)
-    st.altair_chart(chart, use_container_width=True)
+    # Altair's default transformer caps inline data at 5000 rows, which a
+    # wide multi-country selection exceeds; lift the cap while compiling
+    with alt.data_transformers.enable("default", max_rows=None):
+        return chart.to_dict()
+
+if not chart_df.empty:
+    st.subheader("Interactive Chart")
+    st.vega_lite_chart(_make_chart(chart_df), use_container_width=True)
 else:
-    if not selected_codes:
-        st.info("Please select one or more countries to display data.")
-    else:
-        st.warning("No data available for the selected options.")
+    st.warning("No data available for the selected options.")
 
 # ===============================
-# 6. Data Export
+# 4. Data Export
 # ===============================
+@st.cache_data(show_spinner=False)
+def _csv_bytes(df):
+    import pyarrow as pa
+    import pyarrow.csv
+
+    buf = BytesIO()
+    pa.csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue()
+
 st.subheader("Data Export")
 if not chart_df.empty:
-    csv = chart_df.to_csv(index=False).encode("utf-8")
+    csv = _csv_bytes(chart_df)
     st.download_button(
         "Download CSV (with Source Type)", 
         csv, 
@@ -174,9 +154,6 @@ if not chart_df.empty:
         "text/csv"
     )
 else:
-    if not selected_codes:
-        st.info("Select countries to enable data export.")
-    else:
-        st.info("No data available for export with current selection.")
+    st.info("No data available for export with current selection.")
 
 # End of file
@@ -0,0 +1,181 @@
+
+import os
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import requests
+import asyncio
+import aiohttp
+import orjson
+
+# Shared World Bank client for all Streamlit entry-points. Keeping the
+# fetch/build layer in one module means every app hits the same
+# st.cache_data entries instead of each file owning a private cache.
+
+INDICATORS = {
+    "military": "MS.MIL.XPND.GD.ZS",
+    "education": "SE.XPD.TOTL.GD.ZS",
+    "health": "SH.XPD.CHEX.GD.ZS",
+}
+
+METRIC_COLUMNS = ["Military", "Education", "Health", "Butter", "G/B Ratio"]
+
+# Optional on-disk snapshot written by build_snapshot.py; when present,
+# fetches are served from it instead of the live API
+SNAPSHOT_PATH = "wb_snapshot.parquet"
+
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": "guns-butter/1.0"})
+SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=32))
+
+@st.cache_resource(ttl=86400, show_spinner=False)
+def get_country_list():
+    url = "https://api.worldbank.org/v2/country?format=json&per_page=500"
+    res = orjson.loads(SESSION.get(url, timeout=10).content)[1]
+    country_data = {c["id"]: {"name": c["name"], "region": c["region"]["value"]}
+                    for c in res if c["region"]["value"] != "Aggregates"}
+    # Build the lookup views once here so reruns don't re-scan the list
+    code_to_name = {code: f"{info['name']} ({code})" for code, info in country_data.items()}
+    codes = sorted(country_data, key=code_to_name.get)
+    code_to_region = {code: info["region"] for code, info in country_data.items()}
+    return country_data, codes, code_to_name, code_to_region
+
+def _bucket_years(years):
+    # Round out to 5-year buckets so neighbouring slider positions
+    # share a cache entry instead of each forcing a fresh fetch
+    y0, y1 = years
+    return y0 - y0 % 5, y1 + 4 - y1 % 5
+
+def _indicator_url(code, years=None):
+    # The API accepts semicolon-joined indicator ids with source=2,
+    # so one request covers all three series for a country
+    inds = ";".join(INDICATORS.values())
+    url = f"https://api.worldbank.org/v2/country/{code}/indicator/{inds}?format=json&source=2&per_page=20000"
+    if years is not None:
+        url += f"&date={years[0]}:{years[1]}"
+    return url
+
+def _group_series(rows):
+    grouped = {ind: [] for ind in INDICATORS.values()}
+    for r in rows:
+        if r["value"] is not None:
+            grouped[r["indicator"]["id"]].append((int(r["date"]), r["value"]))
+    series = {}
+    for ind, pairs in grouped.items():
+        pairs.sort()
+        years = np.fromiter((p[0] for p in pairs), dtype=np.int32, count=len(pairs))
+        vals = np.fromiter((p[1] for p in pairs), dtype=np.float64, count=len(pairs))
+        series[ind] = pd.Series(vals, index=years, name="value")
+    return series
+
+@st.cache_resource(show_spinner=False)
+def _load_snapshot():
+    if not os.path.exists(SNAPSHOT_PATH):
+        return None
+    return pd.read_parquet(SNAPSHOT_PATH)
+
+def _snapshot_series(code, years=None):
+    snap = _load_snapshot()
+    if snap is None:
+        return None
+    rows = snap[snap["code"] == code]
+    if rows.empty:
+        return None
+    if years is not None:
+        rows = rows[rows["year"].between(years[0], years[1])]
+    series = {}
+    for ind in INDICATORS.values():
+        sub = rows[rows["indicator"] == ind].sort_values("year")
+        series[ind] = pd.Series(sub["value"].to_numpy(np.float64),
+                                index=sub["year"].to_numpy(np.int32), name="value")
+    return series
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def fetch_country_all(code, years=None):
+    series = _snapshot_series(code, years)
+    if series is not None:
+        return series
+    res = orjson.loads(SESSION.get(_indicator_url(code, years), timeout=10).content)
+    rows = res[1] if len(res) > 1 and res[1] else []
+    return _group_series(rows)
+
+async def _fetch_json(session, url):
+    async with session.get(url) as r:
+        return orjson.loads(await r.read())
+
+async def _fetch_country_all_async(session, code, years=None):
+    series = _snapshot_series(code, years)
+    if series is not None:
+        return series
+    res = await _fetch_json(session, _indicator_url(code, years))
+    rows = res[1] if len(res) > 1 and res[1] else []
+    return _group_series(rows)
+
+def _interp_inside(values, years):
+    # Linear fill of interior NaN runs only (edge years stay NaN),
+    # matching interpolate(limit_area="inside") without pandas'
+    # per-column call overhead
+    out = values.copy()
+    valid = ~np.isnan(values)
+    if valid.sum() < 2:
+        return out
+    filled = np.interp(years, years[valid], values[valid])
+    first, last = np.flatnonzero(valid)[[0, -1]]
+    inside = np.zeros(len(values), dtype=bool)
+    inside[first:last + 1] = True
+    fill_mask = ~valid & inside
+    out[fill_mask] = filled[fill_mask]
+    return out
+
+def _build_from_series(series, interpolate):
+    mil = series[INDICATORS["military"]]
+    edu = series[INDICATORS["education"]]
+    hlth = series[INDICATORS["health"]]
+    if mil.empty or edu.empty or hlth.empty:
+        return None
+    df = pd.DataFrame({
+        "Military": mil,
+        "Education": edu,
+        "Health": hlth,
+    })
+    df.eval("Butter = Education + Health\nGB_Ratio = Military / (Education + Health)", inplace=True)
+    df.rename(columns={"GB_Ratio": "G/B Ratio"}, inplace=True)
+    df = df.sort_index().astype(np.float32)
+    # Index alignment can widen the int32 year index; pin it back so
+    # consumers never need a to_numeric/astype pass on the Year column
+    df.index = pd.Index(df.index.astype(np.int32), name="Year")
+    # Categorical with both labels up front: filters compare int8 codes
+    # and the Interpolated tag can be assigned without a dtype change
+    df["Source"] = pd.Categorical(np.full(len(df), "Real"), categories=["Real", "Interpolated"])
+    if interpolate and df.isna().values.any():
+        years_arr = df.index.to_numpy(np.float64)
+        for col in METRIC_COLUMNS:
+            vals = df[col].to_numpy(np.float64)
+            nan_mask = np.isnan(vals)
+            if not nan_mask.any():
+                continue
+            filled = _interp_inside(vals, years_arr)
+            changed = nan_mask & ~np.isnan(filled)
+            if changed.any():
+                df[col] = filled.astype(np.float32)
+                df.loc[changed, "Source"] = "Interpolated"
+    return df
+
+@st.cache_data(ttl=86400, show_spinner=False, max_entries=256)
+def build_metrics(code, interpolate=True, years=None):
+    if years is not None:
+        years = _bucket_years(years)
+    return _build_from_series(fetch_country_all(code, years), interpolate)
+
+async def _build_all_async(codes, interpolate, years):
+    # One concurrent wave of N requests over a shared, pooled session
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=32)) as session:
+        results = await asyncio.gather(*(_fetch_country_all_async(session, c, years) for c in codes))
+    return {code: _build_from_series(series, interpolate) for code, series in zip(codes, results)}
+
+@st.cache_data(ttl=86400, show_spinner=False, max_entries=64)
+def build_all_metrics(codes, interpolate=True, years=None):
+    if years is not None:
+        years = _bucket_years(years)
+    return asyncio.run(_build_all_async(codes, interpolate, years))